@@ -2,6 +2,7 @@ import aiohttp
 import json
 import logging
 import os
+from functools import lru_cache
 from typing import List, Type, Optional, Union, Dict, Any
 from urllib.parse import urljoin, urlparse
 from pydantic import BaseModel
@@ -33,6 +34,15 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
+@lru_cache(maxsize=8)
+def _shared_client(api_key: str, api_version: str, azure_endpoint: str) -> AsyncAzureOpenAI:
+    """Return a shared client per credential set so its HTTP connection pool is reused"""
+    return AsyncAzureOpenAI(
+        api_key=api_key,
+        api_version=api_version,
+        azure_endpoint=azure_endpoint
+    )
+
 class AzureOpenAIProvider(AIProvider):
     
     @property
@@ -68,6 +78,14 @@ class AzureOpenAIProvider(AIProvider):
             
         return endpoint
     
+    def _get_client(self) -> AsyncAzureOpenAI:
+        """Get the shared Azure OpenAI client for this provider's configuration"""
+        return _shared_client(
+            self.config["api_key"],
+            self.config.get("api_version", "2024-02-15-preview"),
+            self._validate_endpoint(self.config["endpoint"])
+        )
+    
     async def generate_response(
         self, 
         messages: List[AIMessage], 
@@ -77,11 +95,7 @@ class AzureOpenAIProvider(AIProvider):
             raise ValueError("Azure OpenAI provider is not properly configured")
         
         try:
-            client = AsyncAzureOpenAI(
-                api_key=self.config["api_key"],
-                api_version=self.config.get("api_version", "2024-02-15-preview"),
-                azure_endpoint=self._validate_endpoint(self.config["endpoint"])
-            )
+            client = self._get_client()
             
             openai_messages = [
                 {"role": msg.role, "content": msg.content} 
@@ -130,11 +144,7 @@ class AzureOpenAIProvider(AIProvider):
             raise ValueError("Azure OpenAI provider is not properly configured")
         
         try:
-            client = AsyncAzureOpenAI(
-                api_key=self.config["api_key"],
-                api_version=self.config.get("api_version", "2024-02-15-preview"),
-                azure_endpoint=self._validate_endpoint(self.config["endpoint"])
-            )
+            client = self._get_client()
             
             # Convert Pydantic model to OpenAI function schema
             function_schema = self._pydantic_to_function_schema(response_model)
@@ -3,11 +3,10 @@ import uuid
 import re
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from io import BytesIO
 
 from .base import AIProvider, AIMessage, AIResponse
 from .function_models import QuoteData, CustomerInfo, QuoteLineItem
-from services.pdf_generator import PDFGenerator
+from services.pdf_generator import pdf_generator
 from services.elasticsearch_service import get_elasticsearch_service
 from .dynamic_extraction_agent import DynamicExtractionAgent
 
@@ -31,7 +30,7 @@ class QuoteGenerationAgent(AIProvider):
     def __init__(self, base_provider: AIProvider, **kwargs):
         super().__init__(**kwargs)
         self.base_provider = base_provider
-        self.pdf_generator = PDFGenerator()
+        self.pdf_generator = pdf_generator
         self.elasticsearch = get_elasticsearch_service()
         # Use the dynamic extraction agent
         self.data_extractor = DynamicExtractionAgent(base_provider)
@@ -257,43 +256,20 @@ Consider the timeline urgency when generating next steps.
         try:
             print("📄 Generating PDF for quote...")
             
-            # Generate PDF using the PDF generator service
-            pdf_data = self.pdf_generator.generate_quote_pdf(quote)
+            # Generate the PDF straight into its file under Data/quotes
+            quote_id = quote.get('quote_id', 'unknown')
+            pdf_filename = f"quote_{quote_id}.pdf"
+            pdf_path = await self.pdf_generator.asave_pdf_to_file(quote, pdf_filename)
+            
+            # Add PDF information to quote
+            quote['pdf_filename'] = pdf_filename
+            quote['pdf_path'] = pdf_path
+            quote['pdf_url'] = f"/api/quotes/download-pdf/{quote_id}"
+            quote['pdf_generated'] = True
+            quote['pdf_generated_at'] = datetime.now().isoformat()
+            
+            print(f"✅ PDF generated successfully: {pdf_path}")
             
-            if pdf_data:
-                # Save PDF to file
-                quote_id = quote.get('quote_id', 'unknown')
-                pdf_filename = f"quote_{quote_id}.pdf"
-                pdf_path = f"Data/quotes/{pdf_filename}"
-                
-                # Ensure directory exists
-                import os
-                os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-                
-                # Write PDF data
-                if isinstance(pdf_data, bytes):
-                    with open(pdf_path, 'wb') as f:
-                        f.write(pdf_data)
-                elif isinstance(pdf_data, BytesIO):
-                    with open(pdf_path, 'wb') as f:
-                        f.write(pdf_data.getvalue())
-                else:
-                    print(f"⚠️ Unexpected PDF data type: {type(pdf_data)}")
-                    return quote
-                
-                # Add PDF information to quote
-                quote['pdf_filename'] = pdf_filename
-                quote['pdf_path'] = pdf_path
-                quote['pdf_url'] = f"/api/quotes/download-pdf/{quote_id}"
-                quote['pdf_generated'] = True
-                quote['pdf_generated_at'] = datetime.now().isoformat()
-                
-                print(f"✅ PDF generated successfully: {pdf_path}")
-                
-            else:
-                print("⚠️ PDF generation returned no data")
-                quote['pdf_error'] = "PDF generation failed - no data returned"
-                
         except Exception as e:
             print(f"❌ PDF generation failed: {str(e)}")
             quote['pdf_error'] = f"PDF generation error: {str(e)}"
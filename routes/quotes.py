@@ -3,7 +3,7 @@ from fastapi.responses import StreamingResponse
 from typing import Dict, Any
 from ai_services.factory import AIServiceFactory
 from ai_services.b2b_sales_agent import B2BSalesAgent
-from services.pdf_generator import PDFGenerator
+from services.pdf_generator import pdf_generator
 import os
 from pathlib import Path
 
@@ -60,8 +60,7 @@ async def download_quote_pdf(quote_id: str):
 async def generate_pdf_from_quote_data(quote_data: Dict[str, Any]):
     """Generate PDF from existing quote data"""
     try:
-        pdf_generator = PDFGenerator()
-        pdf_buffer = pdf_generator.generate_quote_pdf(quote_data)
+        pdf_buffer = await pdf_generator.agenerate_quote_pdf(quote_data)
         
         return StreamingResponse(
             iter([pdf_buffer.getvalue()]),
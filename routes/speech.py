@@ -1,8 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body, Depends, Form
+from fastapi.responses import Response, StreamingResponse
 from typing import Optional, Union
 from services.speech_service import SpeechService
 from pydantic import BaseModel
 import base64
+import json
+from contextlib import AsyncExitStack, asynccontextmanager
 import logging
 from sqlalchemy.orm import Session
 from db.database import get_db
@@ -32,6 +35,7 @@ async def transcribe_audio(
     audio: UploadFile = File(None),
     language: Optional[str] = None,
     audio_data: Optional[AudioData] = None,
+    word_timestamps: bool = False,
     speech_service: SpeechService = Depends(get_speech_service)
 ):
     """
@@ -45,6 +49,7 @@ async def transcribe_audio(
         audio: The audio file to transcribe (for file upload)
         language: Optional language code (e.g., "en", "ja", "es")
         audio_data: JSON payload with base64 encoded audio data
+        word_timestamps: Include per-word timings in each segment
         speech_service: Initialized speech service instance
         
     Returns:
@@ -64,7 +69,8 @@ async def transcribe_audio(
             try:
                 result = await speech_service.transcribe_audio(
                     audio.file,
-                    language=language
+                    language=language,
+                    word_timestamps=word_timestamps
                 )
                 return result
             except Exception as e:
@@ -83,7 +89,8 @@ async def transcribe_audio(
                 logger.info(f"Decoded {len(audio_bytes)} bytes from base64")
                 result = await speech_service.transcribe_audio(
                     audio_bytes,
-                    language=audio_data.language or language
+                    language=audio_data.language or language,
+                    word_timestamps=word_timestamps
                 )
                 return result
             except Exception as e:
@@ -108,6 +115,62 @@ async def transcribe_audio(
             detail=f"Error processing audio: {str(e)}"
         )
 
+@router.post("/transcribe/stream")
+async def transcribe_audio_stream(
+    audio: UploadFile = File(...),
+    language: Optional[str] = None,
+    word_timestamps: bool = False
+):
+    """
+    Transcribe audio to text using Whisper, streaming segments as they are decoded.
+    
+    Args:
+        audio: The audio file to transcribe
+        language: Optional language code (e.g., "en", "ja", "es")
+        word_timestamps: Include per-word timings in each segment
+        
+    Returns:
+        StreamingResponse: Newline-delimited JSON, one transcription segment per line
+    """
+    if not audio.content_type.startswith(('audio/', 'video/')):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an audio file"
+        )
+    
+    # Read the upload now; the request's file may be closed before the stream finishes
+    audio_bytes = await audio.read()
+    
+    # Dependency teardown runs before a streaming body starts, so the speech service is
+    # opened here and closed by the body once the stream ends
+    exit_stack = AsyncExitStack()
+    try:
+        speech_service = await exit_stack.enter_async_context(
+            asynccontextmanager(get_speech_service)()
+        )
+        # Decode the audio and start Whisper before any response bytes are sent, so a bad
+        # upload or a failed model load still gets a proper error status
+        segments = await speech_service.transcribe_audio_stream(
+            audio_bytes, language=language, word_timestamps=word_timestamps
+        )
+    except Exception as e:
+        await exit_stack.aclose()
+        logger.error(f"Error starting streamed transcription: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing audio file: {str(e)}"
+        )
+    
+    async def segment_lines():
+        try:
+            async for segment in segments:
+                yield json.dumps(segment) + "\n"
+        finally:
+            await segments.aclose()
+            await exit_stack.aclose()
+    
+    return StreamingResponse(segment_lines(), media_type="application/x-ndjson")
+
 @router.post("/chat/voice")
 async def handle_voice_message(
     audio: UploadFile = File(...),
@@ -339,4 +402,33 @@ async def text_to_speech(
         raise HTTPException(
             status_code=500,
             detail=f"Error converting text to speech: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.post("/text-to-speech/audio")
+async def text_to_speech_audio(
+    request: TextToSpeechRequest,
+    speech_service: SpeechService = Depends(get_speech_service)
+):
+    """
+    Convert text to speech using gTTS and return the raw MP3 audio.
+    
+    Args:
+        request: TextToSpeechRequest containing text and optional language
+        speech_service: Initialized speech service instance
+        
+    Returns:
+        Response: MP3 audio bytes (audio/mpeg)
+    """
+    try:
+        audio_bytes = await speech_service.synthesize_speech(
+            text=request.text,
+            language=request.language
+        )
+        return Response(content=audio_bytes, media_type="audio/mpeg")
+        
+    except Exception as e:
+        logger.error(f"Error in text-to-speech audio endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error converting text to speech: {str(e)}"
+        )
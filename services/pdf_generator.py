@@ -4,260 +4,397 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+from reportlab.pdfbase import pdfmetrics
 from io import BytesIO
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO, List, Optional
 import os
+import tempfile
+import asyncio
+import logging
 from pathlib import Path
 
+# Load the standard font metrics once at import so the first doc.build()
+# does not pay for parsing them
+for _font_name in ('Helvetica', 'Helvetica-Bold'):
+    pdfmetrics.getFont(_font_name)
+
+logger = logging.getLogger(__name__)
+
+# Create the quotes directory once instead of on every save
+_QUOTES_DIR = Path("Data/quotes")
+try:
+    _QUOTES_DIR.mkdir(parents=True, exist_ok=True)
+except OSError as e:
+    logger.warning(f"Could not create quotes directory {_QUOTES_DIR}: {e}")
+
+# Mode a plain open(..., 'wb') would give new files. os.umask can only be read by
+# setting it, so do that once at import rather than around every save
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_PDF_FILE_MODE = 0o666 & ~_UMASK
+
+# Table layouts are the same for every quote, so build their styles once
+_INFO_COL_WIDTHS = [2*inch, 3*inch]
+_ITEMS_COL_WIDTHS = [1.2*inch, 3*inch, 0.6*inch, 0.8*inch, 0.9*inch]
+_PRICING_COL_WIDTHS = [4*inch, 2*inch]
+
+_QUOTE_INFO_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+_CUSTOMER_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+_ITEMS_TABLE_STYLE = TableStyle([
+    # Header styling
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    
+    # Data styling
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),  # Right align numbers
+    ('ALIGN', (0, 1), (1, -1), 'LEFT'),    # Left align text
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),   # Top align for better text wrapping
+    
+    # Grid
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    
+    # Alternating row colors
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    
+    # Add padding for better readability
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+])
+
+_PRICING_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, 1), 'Helvetica'),
+    ('FONTNAME', (1, 2), (1, 2), 'Helvetica-Bold'),  # Bold total
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('FONTSIZE', (1, 2), (1, 2), 12),  # Larger total
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('LINEBELOW', (0, 1), (-1, 1), 1, colors.black),  # Line above total
+])
+
+
+# Text width available inside the item name column (minus cell padding)
+_NAME_TEXT_WIDTH = _ITEMS_COL_WIDTHS[0] - 12
+
+
+# Currency formatter shared by the line-item and pricing tables
+_money = "${:,.2f}".format
+
+
+def _fmt_date(value) -> str:
+    """Return the YYYY-MM-DD part of an ISO timestamp without parsing it"""
+    return value[:10] if value else 'N/A'
+
+
+def _cell(text: str, style: ParagraphStyle, width: float):
+    """Return plain text when it fits on one line without markup, else a wrapping Paragraph"""
+    if ('<' in text or '&' in text or '\n' in text
+            or pdfmetrics.stringWidth(text, 'Helvetica', 9) > width):
+        return Paragraph(text, style)
+    return text
+
+
+@dataclass(slots=True, frozen=True)
+class QuoteView:
+    """Quote fields used by the PDF, resolved from the raw quote dict once"""
+    quote_title: str
+    company_tagline: str
+    quote_number: str
+    created_at: str
+    valid_until: str
+    customer_info: Dict[str, Any]
+    line_items: List[Dict[str, Any]]
+    currency: str
+    subtotal: float
+    tax_amount: float
+    total: float
+    terms_and_conditions: List[str]
+    implementation_notes: List[str]
+    next_steps: List[str]
+    
+    @classmethod
+    def from_dict(cls, quote_data: Dict[str, Any]) -> "QuoteView":
+        get = quote_data.get
+        return cls(
+            quote_title=get('quote_title', 'Technology Solution Quote'),
+            company_tagline=get('company_tagline', 'Professional Technology Solutions'),
+            quote_number=get('quote_number', 'N/A'),
+            created_at=_fmt_date(get('created_at')),
+            valid_until=_fmt_date(get('valid_until')),
+            customer_info=get('customer_info', {}),
+            line_items=get('line_items', []),
+            currency=get('currency', 'USD'),
+            subtotal=get('subtotal', 0),
+            tax_amount=get('tax_amount', 0),
+            total=get('total', 0),
+            terms_and_conditions=get('terms_and_conditions', []),
+            implementation_notes=get('implementation_notes', []),
+            next_steps=get('next_steps', []),
+        )
+
+
+@lru_cache(maxsize=1)
+def _build_styles():
+    """Build the sample stylesheet plus the custom quote styles, once per process"""
+    styles = getSampleStyleSheet()
+    
+    # Company header style
+    styles.add(ParagraphStyle(
+        name='CompanyHeader',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#2E4057'),
+        alignment=TA_CENTER,
+        spaceAfter=30
+    ))
+    
+    # Quote title style
+    styles.add(ParagraphStyle(
+        name='QuoteTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=12,
+        textColor=colors.HexColor('#2c3e50'),
+        alignment=TA_CENTER
+    ))
+    
+    # Section header style
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading3'],
+        fontSize=14,
+        textColor=colors.HexColor('#2E4057'),
+        alignment=TA_LEFT,
+        spaceAfter=12,
+        spaceBefore=20
+    ))
+    
+    # Table cell style for descriptions
+    styles.add(ParagraphStyle(
+        name='TableCell',
+        parent=styles['Normal'],
+        fontSize=9,
+        leading=11,
+        leftIndent=2,
+        rightIndent=2,
+        spaceAfter=0,
+        spaceBefore=0
+    ))
+    
+    # Small text style
+    styles.add(ParagraphStyle(
+        name='SmallText',
+        parent=styles['Normal'],
+        fontSize=8,
+        leading=10
+    ))
+    
+    # Add custom styles for the new quote format
+    styles.add(ParagraphStyle(
+        name='CompanyTagline',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#7f8c8d'),
+        alignment=TA_CENTER,
+        spaceAfter=20
+    ))
+    
+    return styles
+
+
 class PDFGenerator:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+        # Styles are shared across instances and only read after setup
+        self.styles = _build_styles()
+    
+    def _create_doc(self, buffer: BinaryIO) -> SimpleDocTemplate:
+        """Create the PDF document with the standard quote margins"""
+        return SimpleDocTemplate(
+            buffer,
+            pagesize=letter,
+            rightMargin=50,
+            leftMargin=50,
+            topMargin=50,
+            bottomMargin=50
+        )
     
-    def _setup_custom_styles(self):
-        """Setup custom styles for the PDF"""
-        # Company header style
-        self.styles.add(ParagraphStyle(
-            name='CompanyHeader',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2E4057'),
-            alignment=TA_CENTER,
-            spaceAfter=30
-        ))
+    def _build_story(self, quote_data: Dict[str, Any]) -> List[Any]:
+        """Build the flowables for a single quote"""
+        q = QuoteView.from_dict(quote_data)
         
-        # Quote title style
-        self.styles.add(ParagraphStyle(
-            name='QuoteTitle',
-            parent=self.styles['Heading1'],
-            fontSize=16,
-            spaceAfter=12,
-            textColor=colors.HexColor('#2c3e50'),
-            alignment=TA_CENTER
-        ))
+        # Look up the styles used below once
+        styles = self.styles
+        heading2 = styles['Heading2']
+        normal = styles['Normal']
+        table_cell = styles['TableCell']
         
-        # Section header style
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading3'],
-            fontSize=14,
-            textColor=colors.HexColor('#2E4057'),
-            alignment=TA_LEFT,
-            spaceAfter=12,
-            spaceBefore=20
-        ))
+        # Build PDF content, starting with the title and tagline header
+        story = [
+            Paragraph(q.quote_title, styles['QuoteTitle']),
+            Paragraph(q.company_tagline, styles['CompanyTagline']),
+            Spacer(1, 12),
+        ]
         
-        # Table cell style for descriptions
-        self.styles.add(ParagraphStyle(
-            name='TableCell',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            leading=11,
-            leftIndent=2,
-            rightIndent=2,
-            spaceAfter=0,
-            spaceBefore=0
-        ))
+        # Quote information
+        quote_info = [
+            ['Quote Number:', q.quote_number],
+            ['Date:', q.created_at],
+            ['Valid Until:', q.valid_until],
+        ]
         
-        # Small text style
-        self.styles.add(ParagraphStyle(
-            name='SmallText',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            leading=10
-        ))
+        quote_table = Table(quote_info, colWidths=_INFO_COL_WIDTHS)
+        quote_table.setStyle(_QUOTE_INFO_TABLE_STYLE)
+        story.extend((quote_table, Spacer(1, 20)))
         
-        # Add custom styles for the new quote format
-        self.styles.add(ParagraphStyle(
-            name='CompanyTagline',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#7f8c8d'),
-            alignment=TA_CENTER,
-            spaceAfter=20
-        ))
-    
-    def generate_quote_pdf(self, quote_data: Dict[str, Any]) -> BytesIO:
-        """Generate PDF from quote data"""
-        buffer = BytesIO()
-        
-        try:
-            # Create PDF document with better margins
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=letter,
-                rightMargin=50,
-                leftMargin=50,
-                topMargin=50,
-                bottomMargin=50
-            )
+        # Customer information
+        customer_info = q.customer_info
+        if customer_info:
+            story.append(Paragraph('Customer Information', heading2))
             
-            # Build PDF content
-            story = []
-            
-            # Header with title and tagline
-            story.append(Paragraph(quote_data.get('quote_title', 'Technology Solution Quote'), self.styles['QuoteTitle']))
-            story.append(Paragraph(quote_data.get('company_tagline', 'Professional Technology Solutions'), self.styles['CompanyTagline']))
-            story.append(Spacer(1, 12))
+            customer_data = []
+            if customer_info.get('company'):
+                customer_data.append(['Company:', customer_info['company']])
+            if customer_info.get('contact'):
+                customer_data.append(['Contact:', customer_info['contact']])
+            if customer_info.get('email'):
+                customer_data.append(['Email:', customer_info['email']])
+            if customer_info.get('phone'):
+                customer_data.append(['Phone:', customer_info['phone']])
             
-            # Quote information
-            quote_info = [
-                ['Quote Number:', quote_data.get('quote_number', 'N/A')],
-                ['Date:', quote_data.get('created_at', '')[:10] if quote_data.get('created_at') else 'N/A'],
-                ['Valid Until:', quote_data.get('valid_until', '')[:10] if quote_data.get('valid_until') else 'N/A'],
-            ]
-            
-            quote_table = Table(quote_info, colWidths=[2*inch, 3*inch])
-            quote_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            story.append(quote_table)
+            if customer_data:
+                customer_table = Table(customer_data, colWidths=_INFO_COL_WIDTHS)
+                customer_table.setStyle(_CUSTOMER_TABLE_STYLE)
+                story.append(customer_table)
             story.append(Spacer(1, 20))
+        
+        # Line items with better text wrapping
+        story.append(Paragraph('Quote Details', heading2))
+        
+        line_items = q.line_items
+        if line_items:
+            # Create table headers
+            table_data = [['Item', 'Description', 'Qty', 'Unit Price', 'Total']]
             
-            # Customer information
-            customer_info = quote_data.get('customer_info', {})
-            if customer_info:
-                story.append(Paragraph('Customer Information', self.styles['Heading2']))
-                
-                customer_data = []
-                if customer_info.get('company'):
-                    customer_data.append(['Company:', customer_info['company']])
-                if customer_info.get('contact'):
-                    customer_data.append(['Contact:', customer_info['contact']])
-                if customer_info.get('email'):
-                    customer_data.append(['Email:', customer_info['email']])
-                if customer_info.get('phone'):
-                    customer_data.append(['Phone:', customer_info['phone']])
-                
-                if customer_data:
-                    customer_table = Table(customer_data, colWidths=[2*inch, 3*inch])
-                    customer_table.setStyle(TableStyle([
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                    ]))
-                    story.append(customer_table)
-                story.append(Spacer(1, 20))
-            
-            # Line items with better text wrapping
-            story.append(Paragraph('Quote Details', self.styles['Heading2']))
-            
-            line_items = quote_data.get('line_items', [])
-            if line_items:
-                # Create table headers
-                table_data = [['Item', 'Description', 'Qty', 'Unit Price', 'Total']]
-                
-                # Add line items with text wrapping
-                for item in line_items:
-                    # Wrap description text in Paragraph for better formatting
-                    description = item.get('description', '')
-                    if len(description) > 50:  # If description is long, use paragraph style
-                        desc_para = Paragraph(description, self.styles['TableCell'])
-                    else:
-                        desc_para = description
-                    
-                    table_data.append([
-                        Paragraph(item.get('name', ''), self.styles['TableCell']),
-                        desc_para,
-                        str(item.get('quantity', 1)),
-                        f"${item.get('unit_price', 0):,.2f}",
-                        f"${item.get('total_price', 0):,.2f}"
-                    ])
-                
-                # Create table with adjusted column widths
-                items_table = Table(table_data, colWidths=[1.2*inch, 3*inch, 0.6*inch, 0.8*inch, 0.9*inch])
-                items_table.setStyle(TableStyle([
-                    # Header styling
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    
-                    # Data styling
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),  # Right align numbers
-                    ('ALIGN', (0, 1), (1, -1), 'LEFT'),    # Left align text
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),   # Top align for better text wrapping
-                    
-                    # Grid
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    
-                    # Alternating row colors
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-                    
-                    # Add padding for better readability
-                    ('TOPPADDING', (0, 0), (-1, -1), 8),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ]))
-                
-                # Enable automatic row splitting for long content
-                items_table.repeatRows = 1  # Repeat header row on new pages
-                story.append(items_table)
-                story.append(Spacer(1, 20))
-            
-            # Pricing summary
-            currency = quote_data.get('currency', 'USD')
-            pricing_data = [
-                ['Subtotal:', f"${quote_data.get('subtotal', 0):,.2f} {currency}"],
-                ['Tax:', f"${quote_data.get('tax_amount', 0):,.2f} {currency}"],
-                ['Total:', f"${quote_data.get('total', 0):,.2f} {currency}"]
-            ]
+            # Add line items with text wrapping
+            for item in line_items:
+                # Read each field once per row
+                get = item.get
+                name = get('name', '')
+                description = get('description', '')
+                quantity = get('quantity', 1)
+                unit_price = get('unit_price', 0)
+                total_price = get('total_price', 0)
+
+                # Only long descriptions need Paragraph wrapping; short ones stay
+                # plain strings so ReportLab skips paragraph layout for the cell
+                table_data.append([
+                    _cell(name, table_cell, _NAME_TEXT_WIDTH),
+                    Paragraph(description, table_cell) if len(description) > 50 else description,
+                    str(quantity),
+                    _money(unit_price),
+                    _money(total_price)
+                ])
             
-            pricing_table = Table(pricing_data, colWidths=[4*inch, 2*inch])
-            pricing_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, 1), 'Helvetica'),
-                ('FONTNAME', (1, 2), (1, 2), 'Helvetica-Bold'),  # Bold total
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('FONTSIZE', (1, 2), (1, 2), 12),  # Larger total
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('LINEBELOW', (0, 1), (-1, 1), 1, colors.black),  # Line above total
-            ]))
-            story.append(pricing_table)
-            story.append(Spacer(1, 30))
+            # Create table with adjusted column widths
+            items_table = Table(table_data, colWidths=_ITEMS_COL_WIDTHS)
+            items_table.setStyle(_ITEMS_TABLE_STYLE)
             
-            # Terms and conditions
-            terms = quote_data.get('terms_and_conditions', [])
-            if terms:
-                story.append(Paragraph('Terms and Conditions', self.styles['Heading2']))
-                for term in terms:
-                    story.append(Paragraph(f"• {term}", self.styles['Normal']))
+            # Enable automatic row splitting for long content
+            items_table.repeatRows = 1  # Repeat header row on new pages
+            story.extend((items_table, Spacer(1, 20)))
+        
+        # Pricing summary
+        currency = q.currency
+        pricing_data = [
+            ['Subtotal:', f"{_money(q.subtotal)} {currency}"],
+            ['Tax:', f"{_money(q.tax_amount)} {currency}"],
+            ['Total:', f"{_money(q.total)} {currency}"]
+        ]
+        
+        pricing_table = Table(pricing_data, colWidths=_PRICING_COL_WIDTHS)
+        pricing_table.setStyle(_PRICING_TABLE_STYLE)
+        story.extend((pricing_table, Spacer(1, 30)))
+        
+        # Terms and conditions, implementation notes and next steps
+        sections = (
+            ('Terms and Conditions', q.terms_and_conditions),
+            ('Implementation Notes', q.implementation_notes),
+            ('Next Steps', q.next_steps),
+        )
+        for index, (title, entries) in enumerate(sections):
+            if not entries:
+                continue
+            story.append(Paragraph(title, heading2))
+            story.extend([Paragraph(f"• {entry}", normal) for entry in entries])
+            if index < len(sections) - 1:
                 story.append(Spacer(1, 15))
+        
+        return story
+    
+    def generate_quote_pdf(self, quote_data: Dict[str, Any], out: Optional[BinaryIO] = None) -> BinaryIO:
+        """Generate PDF from quote data into `out`, or into a new BytesIO if not given"""
+        buffer = out if out is not None else BytesIO()
+        
+        try:
+            doc = self._create_doc(buffer)
+            doc.build(self._build_story(quote_data))
+            if out is None:
+                buffer.seek(0)
+                logger.debug("Generated quote PDF (%d bytes)", buffer.getbuffer().nbytes)
             
-            # Implementation notes
-            implementation_notes = quote_data.get('implementation_notes', [])
-            if implementation_notes:
-                story.append(Paragraph('Implementation Notes', self.styles['Heading2']))
-                for note in implementation_notes:
-                    story.append(Paragraph(f"• {note}", self.styles['Normal']))
-                story.append(Spacer(1, 15))
+            return buffer
             
-            # Next steps
-            next_steps = quote_data.get('next_steps', [])
-            if next_steps:
-                story.append(Paragraph('Next Steps', self.styles['Heading2']))
-                for step in next_steps:
-                    story.append(Paragraph(f"• {step}", self.styles['Normal']))
+        except Exception as e:
+            logger.error(f"PDF generation error: {str(e)}")
+            raise
+    
+    def generate_quotes_batch_pdf(self, quotes: List[Dict[str, Any]], out: Optional[BinaryIO] = None) -> BinaryIO:
+        """Generate one PDF holding several quotes, each starting on a new page"""
+        buffer = out if out is not None else BytesIO()
+        
+        try:
+            story = []
+            for quote_data in quotes:
+                if story:
+                    story.append(PageBreak())
+                story.extend(self._build_story(quote_data))
             
-            # Build PDF
+            doc = self._create_doc(buffer)
             doc.build(story)
-            buffer.seek(0)
+            if out is None:
+                buffer.seek(0)
             
             return buffer
             
         except Exception as e:
-            print(f"❌ PDF generation error: {str(e)}")
-            raise e
+            logger.error(f"Batch PDF generation error: {str(e)}")
+            raise
+    
+    async def agenerate_quote_pdf(self, quote_data: Dict[str, Any], out: Optional[BinaryIO] = None) -> BinaryIO:
+        """Generate PDF in a worker thread so the event loop is not blocked by doc.build"""
+        return await asyncio.to_thread(self.generate_quote_pdf, quote_data, out)
     
     def save_pdf_to_file(self, quote_data: Dict[str, Any], filename: str = None) -> str:
         """Save PDF to file and return the file path"""
@@ -265,17 +402,31 @@ class PDFGenerator:
             quote_id = quote_data.get('quote_id', 'quote')
             filename = f"quote_{quote_id}.pdf"
         
-        # Ensure the quotes directory exists
-        quotes_dir = Path("Data/quotes")
-        quotes_dir.mkdir(exist_ok=True)
+        file_path = _QUOTES_DIR / filename
         
-        file_path = quotes_dir / filename
+        # Generate PDF into a temp file next to the target and swap it in only
+        # once the build succeeds, so a failed build never leaves a truncated
+        # file behind or clobbers an existing one
+        with tempfile.NamedTemporaryFile(
+            dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp", delete=False
+        ) as f:
+            tmp_path = f.name
+            try:
+                self.generate_quote_pdf(quote_data, out=f)
+            except BaseException:
+                f.close()
+                os.unlink(tmp_path)
+                raise
+        # NamedTemporaryFile creates the file 0600; give it the mode open() would have
+        os.chmod(tmp_path, _PDF_FILE_MODE)
+        os.replace(tmp_path, file_path)
         
-        # Generate PDF
-        pdf_buffer = self.generate_quote_pdf(quote_data)
-        
-        # Save to file
-        with open(file_path, 'wb') as f:
-            f.write(pdf_buffer.getvalue())
-        
-        return str(file_path) 
\ No newline at end of file
+        return str(file_path)
+    
+    async def asave_pdf_to_file(self, quote_data: Dict[str, Any], filename: str = None) -> str:
+        """Save PDF to file from a worker thread and return the file path"""
+        return await asyncio.to_thread(self.save_pdf_to_file, quote_data, filename)
+
+# Shared generator instance. generate_quote_pdf only reads self.styles after
+# setup, so one instance can serve concurrent requests.
+pdf_generator = PDFGenerator()
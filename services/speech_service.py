@@ -1,22 +1,114 @@
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, decode_audio
+from faster_whisper.transcribe import TranscriptionInfo
 import numpy as np
 import io
 import soundfile as sf
-import tempfile
 import os
 from pathlib import Path
-from typing import BinaryIO, Optional, Union
+from typing import AsyncIterator, BinaryIO, Optional, Union
 import logging
 import torch
 import librosa
 import aiohttp
 import asyncio
-from contextlib import asynccontextmanager
+import time
 from gtts import gTTS
 import base64
+import hashlib
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
+# Whisper decodes are CPU/GPU bound; cap how many run at once across all service instances
+_TRANSCRIBE_SEMAPHORE = asyncio.Semaphore(int(os.getenv("WHISPER_MAX_CONCURRENCY", "1")))
+
+# Loaded Whisper models keyed by (model_name, device, compute_type), shared by all
+# SpeechService instances so per-request services don't reload weights
+_MODEL_CACHE: dict[tuple[str, str, str], WhisperModel] = {}
+_MODEL_CACHE_LOCK = asyncio.Lock()
+
+# Temperature schedule faster-whisper falls back through when greedy decoding fails its quality checks
+_FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+# Synthesized MP3 bytes keyed by (text digest, language); canned replies repeat a lot
+_TTS_CACHE: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+_TTS_CACHE_SIZE = int(os.getenv("TTS_CACHE_SIZE", "512"))
+# Total MP3 bytes the cache may hold; long one-off replies would otherwise pin a lot of memory
+_TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+_tts_cache_bytes = 0
+
+# Audio longer than this is run through faster-whisper's Silero VAD so silent stretches are skipped
+_VAD_MIN_SECONDS = float(os.getenv("WHISPER_VAD_MIN_SECONDS", "60"))
+
+def _default_compute_type(device: str) -> str:
+    """Pick the fastest CTranslate2 compute type for the device (overridable via WHISPER_COMPUTE_TYPE)."""
+    override = os.getenv("WHISPER_COMPUTE_TYPE")
+    if override:
+        return override
+    if device == "cuda":
+        # Tensor-core GPUs (compute capability 7.0+) run int8 weights with fp16 activations fastest
+        major, _ = torch.cuda.get_device_capability()
+        return "int8_float16" if major >= 7 else "float16"
+    # CTranslate2 picks the best int8 kernels (AVX512-VNNI etc.) for the CPU itself
+    return "int8"
+
+def _warm_up(model: WhisperModel) -> None:
+    """Run one silent decode so kernel selection and memory-pool growth happen before the first request."""
+    start = time.perf_counter()
+    try:
+        segments, _ = model.transcribe(
+            np.zeros(16000, dtype=np.float32),
+            language="en",
+            beam_size=1,
+            vad_filter=False
+        )
+        list(segments)
+        logger.info(f"Whisper warm-up finished in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        logger.warning(f"Whisper warm-up failed: {str(e)}")
+
+async def _next_segment(segments):
+    """
+    Decode the next Whisper segment in a worker thread while holding a transcription slot.
+    
+    A running decode can't be interrupted, so if the caller is cancelled mid-decode the
+    slot is kept until the thread finishes; the concurrency cap holds and the generator
+    is idle again before anyone closes it.
+    """
+    async with _TRANSCRIBE_SEMAPHORE:
+        pull = asyncio.create_task(asyncio.to_thread(next, segments, None))
+        try:
+            return await asyncio.shield(pull)
+        except asyncio.CancelledError:
+            while not pull.done():
+                try:
+                    await asyncio.wait({pull})
+                except asyncio.CancelledError:
+                    pass
+            if not pull.cancelled() and pull.exception() is not None:
+                logger.warning(f"Whisper decode failed after the stream was cancelled: {pull.exception()}")
+            raise
+
+def _tts_cache_key(text: str, language: str) -> tuple[str, str]:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest(), language
+
+def _tts_cache_put(key: tuple[str, str], audio_bytes: bytes) -> None:
+    """Store synthesized audio, evicting least recently used entries to stay within both limits."""
+    global _tts_cache_bytes
+    if len(audio_bytes) > _TTS_CACHE_MAX_BYTES or key in _TTS_CACHE:
+        return
+    _TTS_CACHE[key] = audio_bytes
+    _tts_cache_bytes += len(audio_bytes)
+    while len(_TTS_CACHE) > _TTS_CACHE_SIZE or _tts_cache_bytes > _TTS_CACHE_MAX_BYTES:
+        _, evicted = _TTS_CACHE.popitem(last=False)
+        _tts_cache_bytes -= len(evicted)
+
+def _gtts_mp3(text: str, language: str) -> bytes:
+    """Synthesize text with gTTS and return the MP3 bytes."""
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=language, slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
 class SpeechService:
     def __init__(self, model_name: str = "medium"):
         """
@@ -28,43 +120,43 @@ class SpeechService:
         self.model_name = model_name
         self.model = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.compute_type = "float16" if self.device == "cuda" else "int8"
+        self.compute_type = _default_compute_type(self.device)
         self.target_sr = 16000  # Whisper expects 16kHz audio
         self._session = None
         self._timeout = aiohttp.ClientTimeout(total=30)  # 30 second timeout
         logger.info(f"Speech service initialized with model: {model_name} on {self.device}")
     
-    @asynccontextmanager
-    async def _get_session(self):
-        """Context manager for aiohttp session."""
-        if self._session is None:
-            self._session = aiohttp.ClientSession(timeout=self._timeout)
+    async def session(self) -> aiohttp.ClientSession:
+        """
+        Return the service's aiohttp session, creating it on first use.
+        
+        The session stays open (and keeps its pooled connections) until close().
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(timeout=self._timeout, connector=connector)
             logger.info("✅ aiohttp session initialized")
-        try:
-            yield self._session
-        except Exception as e:
-            logger.error(f"Session error: {str(e)}")
-            if self._session:
-                await self._session.close()
-                self._session = None
-            raise
-        finally:
-            if self._session:
-                await self._session.close()
-                self._session = None
-                logger.info("✅ aiohttp session closed")
+        return self._session
     
     async def initialize(self):
         """Initialize the Whisper model."""
         try:
-            # Initialize Whisper model
-            self.model = WhisperModel(
-                self.model_name,
-                device=self.device,
-                compute_type=self.compute_type,
-                download_root="./models"
-            )
-            logger.info(f"✅ Whisper model {self.model_name} loaded successfully")
+            key = (self.model_name, self.device, self.compute_type)
+            async with _MODEL_CACHE_LOCK:
+                model = _MODEL_CACHE.get(key)
+                if model is None:
+                    # Load the Whisper model once per process and configuration
+                    model = await asyncio.to_thread(
+                        WhisperModel,
+                        self.model_name,
+                        device=self.device,
+                        compute_type=self.compute_type,
+                        download_root="./models"
+                    )
+                    logger.info(f"✅ Whisper model {self.model_name} loaded successfully")
+                    await asyncio.to_thread(_warm_up, model)
+                    _MODEL_CACHE[key] = model
+            self.model = model
                 
         except Exception as e:
             logger.error(f"Failed to initialize speech service: {str(e)}")
@@ -73,7 +165,7 @@ class SpeechService:
     
     async def close(self):
         """Clean up resources."""
-        # Close Whisper model
+        # Release this instance's handle; the loaded model stays in _MODEL_CACHE
         self.model = None
         
         # Close aiohttp session
@@ -93,44 +185,129 @@ class SpeechService:
             tuple: (audio_array, sample_rate)
         """
         try:
-            # Create a temporary file to store the audio data
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                if isinstance(audio_data, bytes):
-                    temp_file.write(audio_data)
-                else:
-                    temp_file.write(audio_data.read())
-                temp_file.flush()
-                
-                # Load audio with librosa (handles resampling and mono conversion)
-                audio_array, sr = librosa.load(
-                    temp_file.name,
-                    sr=self.target_sr,  # Resample to 16kHz
-                    mono=True,  # Convert to mono
-                    dtype=np.float32
-                )
+            # Decode from memory instead of round-tripping through a temp file
+            if isinstance(audio_data, bytes):
+                audio_data = io.BytesIO(audio_data)
+            start = audio_data.tell()
+            
+            try:
+                # Decode directly with soundfile; cheaper than librosa.load's wrapper
+                audio_array, sr = sf.read(audio_data, dtype='float32', always_2d=False)
                 
-                # Normalize audio
-                if np.abs(audio_array).max() > 1.0:
-                    audio_array = audio_array / np.abs(audio_array).max()
+                # Convert to mono
+                if audio_array.ndim > 1:
+                    audio_array = audio_array.mean(axis=1, dtype=np.float32)
                 
-                logger.info(f"Audio preprocessed: shape={audio_array.shape}, sr={sr}, dtype={audio_array.dtype}")
-                return audio_array, sr
+                # Resample to 16kHz only when the source rate differs
+                if sr != self.target_sr:
+                    audio_array = librosa.resample(
+                        audio_array,
+                        orig_sr=sr,
+                        target_sr=self.target_sr,
+                        res_type="soxr_hq"
+                    )
+                    sr = self.target_sr
+            except RuntimeError:
+                # libsndfile can't read this container (e.g. mp3/webm), decode it with
+                # PyAV through faster-whisper, which also resamples to 16kHz mono
+                audio_data.seek(start)
+                audio_array = decode_audio(audio_data, sampling_rate=self.target_sr)
+                sr = self.target_sr
+            
+            # Normalize audio in place, scanning for the peak only once
+            peak = float(np.abs(audio_array).max()) if audio_array.size else 0.0
+            if peak > 1.0:
+                audio_array *= np.float32(1.0 / peak)
+            
+            logger.info(f"Audio preprocessed: shape={audio_array.shape}, sr={sr}, dtype={audio_array.dtype}")
+            return audio_array, sr
                 
         except Exception as e:
             logger.error(f"Error preprocessing audio: {str(e)}")
             raise
-        finally:
-            # Clean up temporary file
-            if 'temp_file' in locals():
-                try:
-                    os.unlink(temp_file.name)
-                except Exception as e:
-                    logger.warning(f"Failed to delete temporary file: {str(e)}")
+    
+    def _start_transcription(
+        self,
+        audio_array: np.ndarray,
+        language: Optional[str],
+        high_accuracy: bool = False,
+        word_timestamps: bool = False
+    ):
+        """
+        Start a Whisper run and return its lazy segment generator with the run info.
+        
+        Language detection happens here, so call it through asyncio.to_thread.
+        """
+        # Greedy decoding by default; beam search only when explicitly requested
+        beam_size = 5 if high_accuracy else 1
+        # Short clips are mostly speech, so VAD would only add latency; long recordings
+        # often have long silences that are cheaper to drop than to decode
+        use_vad = len(audio_array) > _VAD_MIN_SECONDS * self.target_sr
+        return self.model.transcribe(
+            audio_array,
+            language=language,
+            beam_size=beam_size,
+            vad_filter=use_vad,
+            # faster-whisper's default VadOptions (2s min silence, 400ms padding) keep
+            # word onsets and endings intact at speech boundaries
+            vad_parameters=None,
+            condition_on_previous_text=True,
+            # Re-decode at higher temperatures only when a segment fails the
+            # compression-ratio / log-prob checks
+            temperature=_FALLBACK_TEMPERATURES,
+            compression_ratio_threshold=2.4,
+            log_prob_threshold=-1.0,
+            no_speech_threshold=0.6,
+            word_timestamps=word_timestamps,
+            best_of=beam_size,
+            repetition_penalty=1.0
+        )
+    
+    def _transcribe_sync(
+        self,
+        audio_array: np.ndarray,
+        language: Optional[str],
+        high_accuracy: bool = False,
+        word_timestamps: bool = False
+    ) -> tuple[list, TranscriptionInfo]:
+        """
+        Run Whisper over the audio and decode every segment.
+        
+        This blocks for the whole decode, so call it through asyncio.to_thread.
+        """
+        segments, info = self._start_transcription(
+            audio_array, language, high_accuracy, word_timestamps
+        )
+        
+        # faster-whisper decodes lazily while the segment generator is consumed
+        return list(segments), info
+    
+    @staticmethod
+    def _segment_to_dict(segment) -> dict:
+        """Convert a faster-whisper segment into the JSON shape returned to clients."""
+        return {
+            "text": segment.text,
+            "start": segment.start,
+            "end": segment.end,
+            "avg_logprob": segment.avg_logprob,
+            "no_speech_prob": segment.no_speech_prob,
+            "words": [
+                {
+                    "word": word.word,
+                    "start": word.start,
+                    "end": word.end,
+                    "probability": word.probability
+                }
+                for word in segment.words
+            ] if segment.words else []
+        }
     
     async def transcribe_audio(
         self,
         audio_data: Union[BinaryIO, bytes],
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        high_accuracy: bool = False,
+        word_timestamps: bool = False
     ) -> dict:
         """
         Transcribe audio data using Whisper.
@@ -138,6 +315,8 @@ class SpeechService:
         Args:
             audio_data: Audio data as file-like object or bytes
             language: Optional language code (e.g., "en", "ja", "es")
+            high_accuracy: Use beam search (beam_size=5, best_of=5) instead of greedy decoding
+            word_timestamps: Also align per-word timings (extra decoder pass; "words" is empty otherwise)
             
         Returns:
             dict: Contains transcription text and metadata
@@ -146,52 +325,25 @@ class SpeechService:
             await self.initialize()
             
         try:
-            # Preprocess audio
-            audio_array, sample_rate = self._preprocess_audio(audio_data)
+            # Preprocess audio (decode + resample) in a worker thread
+            audio_array, sample_rate = await asyncio.to_thread(self._preprocess_audio, audio_data)
             logger.info(f"Audio duration: {len(audio_array)/sample_rate:.2f} seconds")
             
-            # Transcribe with Whisper
-            segments, info = self.model.transcribe(
-                audio_array,
-                language=language,
-                beam_size=5,
-                vad_filter=False,  # Disabled VAD filter
-                vad_parameters=dict(
-                    min_silence_duration_ms=1000,
-                    speech_pad_ms=30,
-                    threshold=0.5
-                ),
-                condition_on_previous_text=True,
-                temperature=0.0,
-                compression_ratio_threshold=2.4,
-                no_speech_threshold=0.6,
-                word_timestamps=True,
-                best_of=5,
-                repetition_penalty=1.0
-            )
+            # Transcribe with Whisper off the event loop, bounded by the shared semaphore
+            async with _TRANSCRIBE_SEMAPHORE:
+                segments, info = await asyncio.to_thread(
+                    self._transcribe_sync, audio_array, language, high_accuracy, word_timestamps
+                )
             
-            # Process segments
+            # Process segments, collecting the text in the same pass
             processed_segments = []
+            texts: list[str] = []
             for segment in segments:
-                processed_segments.append({
-                    "text": segment.text,
-                    "start": segment.start,
-                    "end": segment.end,
-                    "avg_logprob": segment.avg_logprob,
-                    "no_speech_prob": segment.no_speech_prob,
-                    "words": [
-                        {
-                            "word": word.word,
-                            "start": word.start,
-                            "end": word.end,
-                            "probability": word.probability
-                        }
-                        for word in segment.words
-                    ] if segment.words else []
-                })
+                processed_segments.append(self._segment_to_dict(segment))
+                texts.append(segment.text)
             
             # Get full text
-            full_text = " ".join(segment["text"] for segment in processed_segments)
+            full_text = " ".join(texts)
             
             return {
                 "text": full_text,
@@ -205,7 +357,65 @@ class SpeechService:
             logger.error(f"Error transcribing audio: {str(e)}")
             raise
 
-    async def text_to_speech(self, text: str, language: str = "en") -> dict:
+    async def transcribe_audio_stream(
+        self,
+        audio_data: Union[BinaryIO, bytes],
+        language: Optional[str] = None,
+        high_accuracy: bool = False,
+        word_timestamps: bool = False
+    ) -> AsyncIterator[dict]:
+        """
+        Start a Whisper run and return an iterator that yields each segment as soon as it is decoded.
+        
+        Decoding the audio, loading the model and language detection all happen before this
+        returns, so their errors are raised here rather than from the iterator.
+        
+        Args:
+            audio_data: Audio data as file-like object or bytes
+            language: Optional language code (e.g., "en", "ja", "es")
+            high_accuracy: Use beam search (beam_size=5, best_of=5) instead of greedy decoding
+            word_timestamps: Also align per-word timings (extra decoder pass; "words" is empty otherwise)
+            
+        Returns:
+            AsyncIterator[dict]: Processed segments, in the same shape as transcribe_audio's "segments"
+        """
+        if self.model is None:
+            await self.initialize()
+            
+        try:
+            audio_array, sample_rate = await asyncio.to_thread(self._preprocess_audio, audio_data)
+            logger.info(f"Audio duration: {len(audio_array)/sample_rate:.2f} seconds")
+            
+            # The segment generator is lazy, so only hold the semaphore while the model is
+            # actually working; a slow consumer must not block other transcriptions
+            async with _TRANSCRIBE_SEMAPHORE:
+                segments, info = await asyncio.to_thread(
+                    self._start_transcription, audio_array, language, high_accuracy, word_timestamps
+                )
+            logger.info(f"Detected language: {info.language} ({info.language_probability:.2f})")
+            
+        except Exception as e:
+            logger.error(f"Error streaming transcription: {str(e)}")
+            raise
+        
+        return self._stream_segments(segments)
+    
+    async def _stream_segments(self, segments) -> AsyncIterator[dict]:
+        """Yield processed segments from a started Whisper run, closing it when done."""
+        try:
+            while True:
+                segment = await _next_segment(segments)
+                if segment is None:
+                    break
+                yield self._segment_to_dict(segment)
+        except Exception as e:
+            logger.error(f"Error streaming transcription: {str(e)}")
+            raise
+        finally:
+            # _next_segment never returns while a decode is still running, so the generator is idle here
+            segments.close()
+
+    async def synthesize_speech(self, text: str, language: str = "en") -> bytes:
         """
         Convert text to speech using gTTS.
         
@@ -214,33 +424,25 @@ class SpeechService:
             language: The language code (e.g., "en", "ja", "es")
             
         Returns:
-            dict: Contains base64 encoded audio data and metadata
+            bytes: MP3 audio data
         """
+        cache_key = _tts_cache_key(text, language)
+        cached = _TTS_CACHE.get(cache_key)
+        if cached is not None:
+            _TTS_CACHE.move_to_end(cache_key)
+            return cached
+        
         max_retries = 3
         retry_delay = 1  # seconds
         
         for attempt in range(max_retries):
             try:
-                # Create a temporary file to store the audio
-                with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-                    # Generate speech using gTTS with timeout
-                    tts = gTTS(text=text, lang=language, slow=False)
-                    tts.save(temp_file.name)
-                    
-                    # Read the generated audio file
-                    with open(temp_file.name, 'rb') as audio_file:
-                        audio_bytes = audio_file.read()
-                    
-                    # Convert to base64
-                    audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                    
-                    return {
-                        "audio_data": audio_base64,
-                        "format": "mp3",
-                        "language": language,
-                        "text_length": len(text)
-                    }
-                    
+                # gTTS makes blocking HTTP calls, so synthesize into memory off the event loop
+                audio_bytes = await asyncio.to_thread(_gtts_mp3, text, language)
+                
+                _tts_cache_put(cache_key, audio_bytes)
+                return audio_bytes
+                
             except Exception as e:
                 logger.error(f"Error in text-to-speech conversion (attempt {attempt + 1}/{max_retries}): {str(e)}")
                 if attempt < max_retries - 1:
@@ -249,10 +451,23 @@ class SpeechService:
                     retry_delay *= 2  # Exponential backoff
                 else:
                     raise Exception(f"Failed to convert text to speech after {max_retries} attempts: {str(e)}")
-            finally:
-                # Clean up temporary file
-                if 'temp_file' in locals():
-                    try:
-                        os.unlink(temp_file.name)
-                    except Exception as e:
-                        logger.warning(f"Failed to delete temporary file: {str(e)}") 
\ No newline at end of file
+
+    async def text_to_speech(self, text: str, language: str = "en") -> dict:
+        """
+        Convert text to speech using gTTS, base64 encoded for JSON responses.
+        
+        Args:
+            text: The text to convert to speech
+            language: The language code (e.g., "en", "ja", "es")
+            
+        Returns:
+            dict: Contains base64 encoded audio data and metadata
+        """
+        audio_bytes = await self.synthesize_speech(text, language)
+        
+        return {
+            "audio_data": base64.b64encode(audio_bytes).decode('ascii'),
+            "format": "mp3",
+            "language": language,
+            "text_length": len(text)
+        }
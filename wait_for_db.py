@@ -13,19 +13,28 @@ def wait_for_db():
         'port': 5432,
         'user': os.getenv('POSTGRES_USER', 'myuser'),
         'password': os.getenv('POSTGRES_PASSWORD', 'mypassword'),
-        'database': os.getenv('POSTGRES_DB', 'chat_db')
+        'database': os.getenv('POSTGRES_DB', 'chat_db'),
+        'connect_timeout': 2  # Don't hang on DNS or half-open TCP
     }
     
     while retry_count < max_retries:
         try:
             conn = psycopg2.connect(**db_config)
-            conn.close()
+            try:
+                # Make sure the server actually answers queries, not just accepts connections
+                with conn.cursor() as cur:
+                    cur.execute("SELECT version()")
+                    cur.fetchone()
+            finally:
+                conn.close()
             print("Database is ready!")
             return True
         except psycopg2.OperationalError:
+            # Exponential backoff: retry quickly at first, capped at 5 seconds
+            delay = min(0.1 * (2 ** retry_count), 5.0)
             retry_count += 1
-            print(f"Database not ready, retrying... ({retry_count}/{max_retries})")
-            time.sleep(2)
+            print(f"Database not ready, retrying in {delay:.1f}s... ({retry_count}/{max_retries})")
+            time.sleep(delay)
     
     print("Database failed to become ready")
     return False